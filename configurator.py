@@ -4,19 +4,99 @@ Allows the custom project to have configuration written in TOML or
 JSON file and easily be converted to the class with same hierarchy
 of values.
 """
+import os
 import json
-import pytomlpp
-import libnacl.secret as crypter
+import re
+import math
+import orjson
+from collections import deque
 from pathlib import Path
-from libnacl.utils import load_key
+from nacl.secret import SecretBox
+from nacl.utils import random
 from typing import Union, Any, Tuple, Callable, Iterator, Iterable, Type
-from functools import update_wrapper
-from inspect import getmembers, isroutine
+from functools import lru_cache, partial, wraps
+from inspect import isroutine, signature
+from stat import S_ISREG
+
+try:
+    import tomllib
+except ImportError:
+    import tomli as tomllib
 
 DATA_PATH = Path.home().joinpath(".everynet/")
 DEFAULT_SECRET_FILE = DATA_PATH.joinpath("secret.key")
 DEFAULT_CFG_FILE = DATA_PATH.joinpath("config")
 RESERVED = ["name"]
+# orjson reads integers beyond 64 bits as floats, they have 19+ digits
+_LONG_DIGITS = re.compile(rb"\d{19}")
+
+
+@lru_cache(maxsize=4096)
+def _realpath(val: str) -> str:
+    return Path(val).resolve().as_posix()
+
+
+def _resolve_path(val: Union[str, Path]) -> str:
+    """Resolve relative path and exapand user home sign `~`.
+
+    Already absolute and normalized paths (e.g. restored from saved config)
+    are returned as is. The rest is resolved with `realpath`, once per
+    absolute path and cached.
+
+    Return:
+    str Posix style path
+    """
+
+    val = os.fspath(val)
+    if val.startswith("/") and "~" not in val and "//" not in val and os.path.normpath(val) == val:
+        return val
+    return _realpath(os.path.join(os.getcwd(), os.path.expanduser(val)))
+
+
+def _is_path_key(key: str) -> bool:
+    """Check if value under `key` should be treated as a path: `path` itself,
+    `*_path` or `path_*`. Keys like `filepath` or `paths` are left as is."""
+    return key == "path" or key.endswith("_path") or key.startswith("path_")
+
+
+def _has_non_finite(obj: Any) -> bool:
+    """Check if parsed data contains NaN or Infinity floats."""
+    stack = [obj]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, float):
+            if not math.isfinite(cur):
+                return True
+        elif isinstance(cur, dict):
+            stack.extend(cur.values())
+        elif isinstance(cur, (list, tuple)):
+            stack.extend(cur)
+    return False
+
+
+def _loads(raw: bytes) -> Any:
+    """Parse JSON bytes. Falls back to stdlib json for NaN/Infinity tokens
+    which orjson rejects and for long digit runs which could be integers
+    orjson would silently read as floats."""
+    if _LONG_DIGITS.search(raw):
+        return json.loads(raw)
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return json.loads(raw)
+
+
+def _dumps(obj: Any) -> bytes:
+    """Serialize to JSON bytes. orjson writes NaN/Infinity as null, so data
+    is scanned (and serialized with stdlib json) only if output has null.
+    Integers beyond 64 bits, which orjson rejects, also go to stdlib json."""
+    try:
+        data = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    except orjson.JSONEncodeError:
+        return json.dumps(obj).encode("utf-8")
+    if b"null" in data and _has_non_finite(obj):
+        return json.dumps(obj).encode("utf-8")
+    return data
 
 
 class BaseObject(object):
@@ -26,87 +106,107 @@ class BaseObject(object):
         self.update(**kwargs)
 
     @classmethod
-    def update(cls, __d: dict = {}, **kwargs) -> None:
-        if __d and kwargs:
-            data = dict(__d).update(**kwargs)
-        else:
-            data = __d or kwargs
+    def update(cls, __d: dict = None, /, **kwargs) -> None:
+        data = __d if __d is not None else {}
+        if kwargs:
+            data = {**data, **kwargs}
+        data = {k: _resolve_path(v) if _is_path_key(k) else v for k, v in data.items()}
         for k, v in data.items():
-            if "path" in k:
-                v = Path(v).expanduser().resolve().as_posix()
             setattr(cls, k, v)
 
 
-class MapDecoder(json.JSONDecoder):
+class MapConverter(object):
     def __init__(
         self,
         bases: Tuple = (BaseObject,),
         processor: Callable = (lambda k, v: v),
-        **kwargs,
     ):
-        """JSONDecoder extend class.
+        """Dictionary to object converter.
 
-        Recursivelly converts dictionaries to objects which attributes are
-        key=value pairs. Keeps nesting - each subdictionary creates 'type'
-        object and became attribute of the parent object.
+        Recursivelly converts already parsed dictionaries to objects which
+        attributes are key=value pairs. Keeps nesting - each subdictionary
+        creates 'type' object and became attribute of the parent object.
 
         Attributes:
 
         bases: Tuple of base classes for type() method.
         processor: Callback to process values before attaching it to class.
         For example, it could be used to convert string path to pathlib.Path().
-
-
         """
 
         self.bases = bases
         self.processor = processor
-        json.JSONDecoder.__init__(self, object_hook=self._object_hook, **kwargs)
-
-    def pack_dict(self, __d: dict = {}, parent: str = "") -> Type:
-        """Recursively walk thru incoming dict and convert all dict values
-        to type() object adding them to parent type as attributes
 
-        Aargs:
+    def _build(self, __d: dict, key: str = "Root") -> Type:
+        """Recursively walk thru incoming dict once, processing leaf values
+        and converting dict values to type() objects.
 
-        __d (dict): dict to parse
-        parent (str): parent key value in case of recursion
+        Args:
+            __d (dict): dict to convert
+            key (str): key of the dict in the parent, used as type name
 
         Returns:
-            dict: {parent: type(...)} if arent is given or just type()
+            type() instance with converted values as attributes
         """
 
         attrs = {}
         for k, v in __d.items():
             if isinstance(v, dict):
-                v = self.pack_dict(v, parent=k)
-            vv = self.processor(k, v) or v
-            attrs.update({k: vv})
-        new_class = type(parent.capitalize(), self.bases, attrs)
-        return new_class()
+                attrs[k] = self._build(v, k)
+            else:
+                attrs[k] = self.processor(k, v) or v
+        return self._new_node(key, attrs)
 
-    def _object_hook(self, dct):
-        """Callback that invoked on every object (actually dict) found in
-        decoded text
+    def _new_node(self, key: str, attrs: dict) -> Any:
+        """Create object for the dict found under `key` with `attrs`
+        as attributes.
+        """
+        return type(key.capitalize(), self.bases, attrs)()
+
+    def convert(self, __d: dict) -> dict:
+        """Convert parsed dict in place of JSON decoding: every value that
+        is a dict became type() object.
 
         Args:
-            dct (dict): dict object
+            __d (dict): dict object
 
         Returns:
             dict: dict where values that are also dicts converted to
             type() objects.
         """
-        rv = {}
-        for k, v in dct.items():
-            if isinstance(v, dict):
-                v = self.pack_dict(v, parent=k)
-            rv.update({k: v})
-        return rv
+        return {k: self._build(v, k) if isinstance(v, dict) else v for k, v in __d.items()}
+
+
+class MapDecoder(MapConverter, json.JSONDecoder):
+    def __init__(
+        self,
+        bases: Tuple = (BaseObject,),
+        processor: Callable = (lambda k, v: v),
+        **kwargs,
+    ):
+        """JSONDecoder extend class.
+
+        Recursivelly converts dictionaries to objects which attributes are
+        key=value pairs. Keeps nesting - each subdictionary creates 'type'
+        object and became attribute of the parent object.
+
+        Attributes:
+
+        bases: Tuple of base classes for type() method.
+        processor: Callback to process values before attaching it to class.
+        For example, it could be used to convert string path to pathlib.Path().
+
+
+        """
+
+        MapConverter.__init__(self, bases=bases, processor=processor)
+        json.JSONDecoder.__init__(self, object_hook=self.convert, **kwargs)
 
     @staticmethod
     def list_generator(indict: dict, pre=None):
-        """Generator, recursivelly converts dict to table(list of lists)
-        where every line is a [parent, parent, parent, ..., key-value]
+        """Generator, converts nested dict to table(list of lists)
+        where every line is a [parent, parent, parent, ..., key-value].
+        Nesting is walked with explicit stack, no recursion.
 
         Args:
             indict (dict):  to convert
@@ -115,20 +215,20 @@ class MapDecoder(json.JSONDecoder):
         Yields:
             list: table of the dictionary hierarchy
         """
-        pre = pre[:] if pre else []
-        if isinstance(indict, dict):
-            for key, value in indict.items():
-                if isinstance(value, dict):
-                    for d in MapDecoder.list_generator(value, pre + [key]):
-                        yield d
-                elif isinstance(value, list) or isinstance(value, tuple):
-                    for v in value:
-                        for d in MapDecoder.list_generator(v, pre + [key]):
-                            yield d
-                else:
-                    yield pre + [key, value]
-        else:
-            yield pre + [indict]
+        stack = deque([(pre[:] if pre else [], indict)])
+        while stack:
+            pre, node = stack.pop()
+            if isinstance(node, dict):
+                rows = []
+                for key, value in node.items():
+                    if isinstance(value, list) or isinstance(value, tuple):
+                        rows.extend((pre + [key], v) for v in value)
+                    else:
+                        rows.append((pre + [key], value))
+                # reversed, so rows are popped in the dict order
+                stack.extend(reversed(rows))
+            else:
+                yield pre + [node]
 
     def walk_map(self, __d: dict, output: list, parent: str = "") -> Type:
         for k, v in __d.items():
@@ -162,41 +262,57 @@ class MapEncoder(json.JSONEncoder):
 
     def process_cls(self, obj):
         """Convert classes in object into dictionary of class attributes.
-        Recursive lookup.
+        Nested objects are walked with explicit stack instead of recursion.
         """
 
-        if hasattr(obj, "__dict__"):
-            attrs = [
-                a
-                for a in getmembers(obj, lambda a: not (isroutine(a)))
-                if not (a[0].startswith("_") and a[0].endswith("_"))
-            ]
-            rv = {}
-            for k, v in attrs:
+        if not hasattr(obj, "__dict__"):
+            return str(obj)
+
+        rv = {}
+        stack = [(obj, rv, frozenset())]
+        while stack:
+            cur, out, ancestors = stack.pop()
+            ancestors = ancestors | {id(cur)}
+            names = {}
+            for cls in reversed(type(cur).__mro__[:-1]):
+                names.update(vars(cls))
+            names.update(vars(cur))
+            for k in names:
+                if k.startswith("_") and k.endswith("_"):
+                    continue
+                v = getattr(cur, k)
+                if isroutine(v):
+                    continue
                 if hasattr(v, "__dict__"):
-                    rv[k] = self.process_cls(v)
+                    if id(v) in ancestors:
+                        raise ValueError("Circular reference detected")
+                    out[k] = {}
+                    stack.append((v, out[k], ancestors))
                 else:
-                    rv[k] = v
-            return rv
-        else:
-            return str(obj)
+                    out[k] = v
+        return rv
 
     def iterencode(self, o: Any, _one_shot: bool) -> Iterator[str]:
         return super().iterencode(self.process_cls(o), _one_shot=_one_shot)
 
 
-class ConfigDecoder(MapDecoder):
+class ConfigDecoder(MapConverter):
     def __init__(self):
         """Default base object for config convertion. Converts keys with 'path'
         into 'pathlib.Path' objects"""
         super().__init__(bases=(BaseConfig,), processor=self.process)
 
     def process(self, key, val):
-        if "path" in key:
-            return Path(val).expanduser().resolve().as_posix()
+        if _is_path_key(key):
+            return _resolve_path(val)
         else:
             return val
 
+    def _new_node(self, key: str, attrs: dict) -> "_Node":
+        node = _Node.__new__(_Node)
+        node.__dict__.update(attrs)
+        return node
+
 
 class BaseConfig(object):
     """Type container. Parent class for config."""
@@ -216,7 +332,10 @@ class BaseConfig(object):
         processor_cb [Callable] value processor callback
         """
 
-        data = dict(data, **kwargs) if data else dict(**kwargs)
+        if data is None:
+            data = kwargs
+        elif kwargs:
+            data = {**data, **kwargs}
         self.set_attr(data, processor_cb)
 
     @staticmethod
@@ -227,24 +346,7 @@ class BaseConfig(object):
         str Posix style path
         """
 
-        return Path(val).expanduser().resolve().as_posix() if "path" in key else val
-
-    @staticmethod
-    def path_resolve(_d: dict) -> dict:
-        """Recursively convert pathes in dict
-
-        Return:
-        dict With converted paths
-        """
-
-        rv = {}
-        for k, v in _d.items():
-            if isinstance(v, dict):
-                v = BaseConfig.path_resolve(v)
-            else:
-                v = BaseConfig.convert_path(k, v)
-            rv.update({k: v})
-        return rv
+        return _resolve_path(val) if _is_path_key(key) else val
 
     def set_attr(self, data: dict = {}, processor_cb: Callable[[str, Any], Any] = None) -> None:
         """Set instance attributes.
@@ -257,9 +359,15 @@ class BaseConfig(object):
         be set if method provided.
         """
 
-        for k, v in data.items():
-            val = BaseConfig.convert_path(k, v)
-            setattr(self, k, processor_cb(k, val) if processor_cb else v)
+        attrs = {k: _resolve_path(v) if _is_path_key(k) else v for k, v in data.items()}
+        if processor_cb:
+            attrs = {k: processor_cb(k, v) for k, v in attrs.items()}
+
+        # Class level attributes (e.g. properties) must go thru setattr
+        cls = type(self)
+        for k in [k for k in attrs if hasattr(cls, k)]:
+            setattr(self, k, attrs.pop(k))
+        self.__dict__.update(attrs)
 
     def add_cls_attr(self, name: str, attrs: dict = {}) -> None:
         """Create new type and add it's instance as attribute.
@@ -273,7 +381,24 @@ class BaseConfig(object):
         self.update({name: cls_attr()})
 
 
+class _Node(BaseConfig):
+    """Config tree node. Attributes are stored in instance __dict__, so no
+    new type is created per node."""
+
+
+_DEFAULT_DECODER = ConfigDecoder()
+
+
 class Config(BaseConfig):
+    # Internal fields only, user attributes are kept in BaseConfig's __dict__
+    __slots__ = (
+        "_save_path_",
+        "_key_path_",
+        "_save_path_str_",
+        "_key_path_str_",
+        "_converted_",
+    )
+
     def __init__(
         self,
         load_path: Union[str, Path] = None,
@@ -289,8 +414,8 @@ class Config(BaseConfig):
             Defaults to None.
         """
         super().__init__()
-        self._save_path_ = Path(save_path).expanduser().resolve()
-        self._key_path_ = Path(key_path).expanduser().resolve()
+        self.save_path = save_path
+        self.key_path = key_path
         if load_path and restore:
             raise ValueError("load_path and restore can't be set simultaneously")
 
@@ -302,19 +427,21 @@ class Config(BaseConfig):
 
     @property
     def save_path(self):
-        return self._save_path_.as_posix()
+        return self._save_path_str_
 
     @save_path.setter
     def save_path(self, val):
-        self._save_path_ = Path(val).expanduser().resolve()
+        self._save_path_str_ = _resolve_path(val)
+        self._save_path_ = Path(self._save_path_str_)
 
     @property
     def key_path(self):
-        return self._key_path_.as_posix()
+        return self._key_path_str_
 
     @key_path.setter
     def key_path(self, val):
-        self._key_path_ = Path(val).expanduser().resolve()
+        self._key_path_str_ = _resolve_path(val)
+        self._key_path_ = Path(self._key_path_str_)
 
     def load(self, load_path: Union[str, Path]) -> None:
         """Read JSON or TOML file and convert it to the Config attributes.
@@ -324,24 +451,28 @@ class Config(BaseConfig):
         path - path to the file to read
 
         Return:
-        dict - data loaded with json or pytomlpp modules
+        dict - data loaded with orjson or tomllib modules
         """
-        data = {}
         self._save_path_.parent.mkdir(exist_ok=True)
-        if p := Path(load_path):
-            if p.exists() and p.is_file():
-                with open(p, "r") as _file:
-                    if p.suffix == ".json":
-                        data = json.load(_file)
-                    elif p.suffix == ".toml":
-                        data = pytomlpp.load(_file)
-                    else:
-                        raise NotImplementedError("Unknown file type")
-                    if raw_dict := BaseConfig.path_resolve(data):
-                        self._converted_ = json.loads(json.dumps(raw_dict), cls=ConfigDecoder)
-                        self.set_attr(self._converted_)
-            else:
-                raise FileNotFoundError("Path isn't a file or not exist")
+        load_path = os.fspath(load_path)
+        try:
+            st = os.stat(load_path)
+        except (FileNotFoundError, NotADirectoryError):
+            st = None
+        if st is None or not S_ISREG(st.st_mode):
+            raise FileNotFoundError("Path isn't a file or not exist")
+
+        if not load_path.endswith((".json", ".toml")):
+            raise NotImplementedError("Unknown file type")
+        with open(load_path, "rb") as _file:
+            raw = _file.read()
+        if load_path.endswith(".json"):
+            data = _loads(raw)
+        else:
+            data = tomllib.loads(raw.decode("utf-8"))
+        if data:
+            self._converted_ = _DEFAULT_DECODER.convert(data)
+            self.set_attr(self._converted_)
 
     def save(
         self,
@@ -363,41 +494,45 @@ class Config(BaseConfig):
         (str, str)  Tuple of two strings: actual path to config file,
                     actual path to secret key file.
         """
-        data = json.dumps(self, cls=MapEncoder).encode("utf-8")
+        data = _dumps(MapEncoder().process_cls(self))
 
         if save_path:
-            self._save_path_ = Path(save_path).expanduser().resolve()
+            self.save_path = save_path
 
         if key_path:
-            self._key_path_ = Path(key_path).expanduser().resolve()
+            self.key_path = key_path
+
+        self._save_path_.write_bytes(self._encrypt(data))
 
-        encrypted = self._encrypt(data)
-        self._save_path_.write_bytes(encrypted)
+    def _load_key(self) -> bytes:
+        """Read secret key stored at `key_path`. Raises FileNotFoundError if
+        there is no key file."""
+        key_data = orjson.loads(self._key_path_.read_bytes())
+        return bytes.fromhex(key_data["priv"])
 
     def _decrypt(self, path: Path) -> bytes:
-        key = load_key(self._key_path_)
         content = self._save_path_.read_bytes()
-        return crypter.SecretBox(key.sk).decrypt(content)
+        return SecretBox(self._load_key()).decrypt(content)
 
     def _encrypt(self, data: Any) -> Any:
-        if self._key_path_.exists():
-            key = load_key(self._key_path_)
-            box = crypter.SecretBox(key.sk)
+        if os.path.isfile(self._key_path_str_):
+            key = self._load_key()
         else:
-            box = crypter.SecretBox()
-            box.save(self._key_path_)
+            key = random(SecretBox.KEY_SIZE)
+            fd = os.open(self._key_path_str_, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "wb") as _file:
+                _file.write(orjson.dumps({"priv": key.hex()}))
 
-        return box.encrypt(data)
+        return SecretBox(key).encrypt(data)
 
     def restore(self) -> None:
         """
         Load and decrypt stored config file using secret key.
         """
-        if self._key_path_:
-            if self._key_path_.exists() and self._key_path_.is_file():
-                decrypted = self._decrypt(self._save_path_)
-                self._converted_ = json.loads(decrypted.decode("utf-8"), cls=ConfigDecoder)
-                self.set_attr(self._converted_)
+        if os.path.isfile(self._key_path_str_):
+            decrypted = self._decrypt(self._save_path_)
+            self._converted_ = _DEFAULT_DECODER.convert(_loads(decrypted))
+            self.set_attr(self._converted_)
 
     def prune(self):
         """
@@ -415,14 +550,20 @@ def configurable(
     load_path: Union[str, Path] = None,
     save_path: Union[str, Path] = None,
     key_path: Union[str, Path] = None,
-) -> Callable[[Config, Any], Any]:
+) -> Callable[..., Any]:
     """
-    Decorator to transorm function to receive existed Config() object.
-    Arguments are the same as for Config class.
+    Decorator to transorm function to receive existed Config() object
+    as the first argument. Arguments are the same as for Config class.
     """
-    cli_config = Config(load_path=load_path, save_path=save_path, key_path=key_path)
-
-    def new_func(config: Config, *args, **kwargs):
-        return f(cli_config, *args, **kwargs)
-
-    return update_wrapper(new_func, f)
+    cli_config = Config(
+        load_path=load_path,
+        save_path=save_path or DEFAULT_CFG_FILE,
+        key_path=key_path or DEFAULT_SECRET_FILE,
+    )
+
+    wrapped = partial(f, cli_config)
+    # Taken before wraps() sets __wrapped__, so the bound config is excluded
+    sig = signature(wrapped)
+    wrapped = wraps(f)(wrapped)
+    wrapped.__signature__ = sig
+    return wrapped
@@ -1,3 +1,6 @@
+import json
+import math
+import os
 import pytest
 import typing
 from ..configurator import (
@@ -6,10 +9,20 @@ from ..configurator import (
     DEFAULT_SECRET_FILE,
     DEFAULT_CFG_FILE,
     DATA_PATH,
+    _is_path_key,
+    _resolve_path,
+    configurable,
 )
+from inspect import signature
 from pathlib import Path
 
 
+@pytest.fixture
+def cfg_paths(tmp_path):
+    """Save and key paths inside of test's temporary directory."""
+    return dict(save_path=tmp_path.joinpath("config"), key_path=tmp_path.joinpath("secret.key"))
+
+
 def test_init():
     cfg = Config()
     cfg.prune()
@@ -103,3 +116,138 @@ def test_has_attr():
     assert hasattr(cfg, "attr")
     cfg.add_cls_attr("test_has_attr")
     assert hasattr(cfg, "test_has_attr")
+
+
+def test_non_finite_floats(tmp_path, cfg_paths):
+    src = tmp_path.joinpath("nan.toml")
+    src.write_text("x = nan\ny = inf\n[sub]\nz = [1.5, -inf]\n")
+    cfg = Config(load_path=src, **cfg_paths)
+    cfg.save()
+    restored = Config(restore=True, **cfg_paths)
+    assert math.isnan(restored.x)
+    assert restored.y == math.inf
+    assert restored.sub.z == [1.5, -math.inf]
+
+    src = tmp_path.joinpath("nan.json")
+    src.write_text('{"x": NaN, "y": Infinity}')
+    cfg = Config(load_path=src, **cfg_paths)
+    assert math.isnan(cfg.x)
+    assert cfg.y == math.inf
+
+
+@pytest.mark.parametrize(
+    "key,expected",
+    [
+        ("path", True),
+        ("save_path", True),
+        ("key_path", True),
+        ("path_to_file", True),
+        ("filepath", False),
+        ("logpath", False),
+        ("paths", False),
+        ("xpath", False),
+        ("name", False),
+    ],
+)
+def test_is_path_key(key, expected):
+    assert _is_path_key(key) is expected
+
+
+def test_configurable(cfg_paths):
+    def handler(config, x, y=1):
+        return config, x, y
+
+    decorated = configurable(
+        handler,
+        load_path="test/cfg.toml",
+        **cfg_paths,
+    )
+    config, x, y = decorated(5, y=2)
+    assert isinstance(config, Config)
+    assert config.build.type == "Debug"
+    assert (x, y) == (5, 2)
+    assert decorated.__name__ == "handler"
+    assert list(signature(decorated).parameters) == ["x", "y"]
+
+    def variadic(*args, **kwargs):
+        return args, kwargs
+
+    decorated = configurable(variadic, **cfg_paths)
+    assert str(signature(decorated)) == "(*args, **kwargs)"
+    args, kwargs = decorated(1, z=2)
+    assert isinstance(args[0], Config)
+    assert args[1:] == (1,)
+    assert kwargs == {"z": 2}
+
+
+def test_key_file(cfg_paths):
+    cfg = Config(**cfg_paths)
+    cfg.update(key="value")
+    cfg.save()
+    key_file = cfg_paths["key_path"]
+    assert os.stat(key_file).st_mode & 0o777 == 0o600
+    assert len(bytes.fromhex(json.loads(key_file.read_text())["priv"])) == 32
+    assert Config(restore=True, **cfg_paths).key == "value"
+
+
+def test_decrypt_without_key(cfg_paths):
+    cfg = Config(**cfg_paths)
+    cfg.save()
+    cfg_paths["key_path"].unlink()
+    with pytest.raises(FileNotFoundError):
+        cfg._decrypt(cfg_paths["save_path"])
+    assert not cfg_paths["key_path"].exists()
+
+
+def test_key_replaced_by_other_config(cfg_paths):
+    first = Config(**cfg_paths)
+    first.update(key="first")
+    first.save()
+
+    second = Config(**cfg_paths)
+    second.prune()
+    second.update(key="second")
+    second.save()
+
+    first.update(key="first again")
+    first.save()
+    assert Config(restore=True, **cfg_paths).key == "first again"
+
+
+def test_resolve_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", tmp_path.as_posix())
+    root = tmp_path.resolve().as_posix()
+    assert _resolve_path("build") == f"{root}/build"
+    assert _resolve_path("./build/../out") == f"{root}/out"
+    assert _resolve_path("~/config") == f"{root}/config"
+    assert _resolve_path(f"{root}//a/./b/../c") == f"{root}/a/c"
+    assert _resolve_path(Path(root, "a")) == f"{root}/a"
+
+
+def test_resolve_path_dotdot_after_symlink(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("HOME", tmp_path.as_posix())
+    tmp_path.joinpath("sub", "target").mkdir(parents=True)
+    tmp_path.joinpath("link").symlink_to(tmp_path.joinpath("sub", "target"))
+    root = tmp_path.resolve().as_posix()
+    # `..` is applied to the symlink target, as the OS does on open()
+    assert _resolve_path("link/../x") == f"{root}/sub/x"
+    assert _resolve_path("~/link/../x") == f"{root}/sub/x"
+    assert _resolve_path(f"{root}/link/../x") == f"{root}/sub/x"
+
+
+def test_big_integers(tmp_path, cfg_paths):
+    cfg = Config(**cfg_paths)
+    cfg.update(big=2**70, negative=-(2**64), small=1)
+    cfg.save()
+    restored = Config(restore=True, **cfg_paths)
+    assert restored.big == 2**70
+    assert restored.negative == -(2**64)
+    assert restored.small == 1
+
+    src = tmp_path.joinpath("big.json")
+    src.write_text('{"big": 1180591620717411303424, "id": "12345678901234567890"}')
+    cfg = Config(load_path=src, **cfg_paths)
+    assert cfg.big == 1180591620717411303424
+    assert cfg.id == "12345678901234567890"
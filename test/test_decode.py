@@ -1,5 +1,6 @@
-from ..configurator import MapDecoder, MapEncoder
+from ..configurator import MapConverter, MapDecoder, MapEncoder
 import json
+import pytest
 from pathlib import Path
 
 raw_data = {
@@ -24,9 +25,65 @@ def test_json_loads():
     assert proj.build.type == "Debug"
     proj.build.update(type="Release")
     assert proj.build.type == "Release"
+    proj.build.update({"output": "exec"}, arch="x86")
+    assert proj.build.output == "exec"
+    assert proj.build.arch == "x86"
+
+
+def test_convert():
+    converted = MapConverter().convert(raw_data)
+    proj = converted["project"]
+    assert proj.build.type == "Debug"
+    assert proj.generator.exclude == [".git", "assets"]
+    assert proj.dependecies.pytomlpp is True
 
 
 def test_encoder():
     decoded = json.loads(json.dumps(raw_data), cls=MapDecoder)
     encoded = json.dumps(decoded, cls=MapEncoder)
     assert encoded == json.dumps(decoded)
+
+
+def test_list_generator():
+    data = {
+        "a": {"b": 1, "c": [1, {"x": 2, "y": [3, [4, 5]]}, ()]},
+        "f": (6, 7),
+        "g": None,
+    }
+    assert list(MapDecoder.list_generator(data)) == [
+        ["a", "b", 1],
+        ["a", "c", 1],
+        ["a", "c", "x", 2],
+        ["a", "c", "y", 3],
+        ["a", "c", "y", [4, 5]],
+        ["a", "c", ()],
+        ["f", 6],
+        ["f", 7],
+        ["g", None],
+    ]
+    assert list(MapDecoder.list_generator({"k": "v"}, ["pre"])) == [["pre", "k", "v"]]
+    assert list(MapDecoder.list_generator(5)) == [[5]]
+
+
+class Node:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def test_process_cls_nested():
+    shared = Node(value=1)
+    root = Node(name="root", child=Node(leaf=[1, 2], sub=Node(x="y")), a=shared, b=shared)
+    assert MapEncoder().process_cls(root) == {
+        "name": "root",
+        "child": {"leaf": [1, 2], "sub": {"x": "y"}},
+        "a": {"value": 1},
+        "b": {"value": 1},
+    }
+    assert MapEncoder().process_cls(5) == "5"
+
+
+def test_process_cls_cycle():
+    parent = Node(name="parent")
+    parent.child = Node(name="child", parent=parent)
+    with pytest.raises(ValueError, match="Circular reference detected"):
+        MapEncoder().process_cls(parent)